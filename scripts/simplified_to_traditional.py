@@ -1,8 +1,9 @@
 import csv
 import os
-import glob
 import re
 import sys # Import sys for command-line arguments
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 # Paths
 # Dictionaries are now in 'scripts/conversion_tools' relative to the project root
@@ -11,103 +12,137 @@ DICTIONARY_DIR = os.path.join(os.path.dirname(__file__), 'conversion_tools')
 # Default target directory
 # This can be overridden by a command-line argument
 DEFAULT_TARGET_DIR = 'Mewgenics_CN_patch/data/text' 
-TARGET_DIR = DEFAULT_TARGET_DIR
 
-# Check for command-line arguments for TARGET_DIR
-if len(sys.argv) > 1:
-    TARGET_DIR = sys.argv[1]
-    print(f"Using target directory from argument: {TARGET_DIR}")
-else:
-    print(f"Using default target directory: {DEFAULT_TARGET_DIR}")
+# Buffer size for CSV reads and writes (1 MiB keeps the syscall count low on large files)
+IO_BUFFER_SIZE = 1 << 20
 
-
-# Load Dictionaries
+# Dictionaries and the lookup structures built from them.
+# They are filled in by load_tables(), not at import time.
 char_map = {}
 phrase_map = {}
 
+# char_map as a str.translate table, used for the text between phrase matches
+char_table = {}
+
+# Every character that can start a conversion: the first character of each
+# phrase plus every char_map key. Text with none of them converts to itself.
+convertible_chars = frozenset()
+
+# Character trie over the phrase keys.
+# Each node maps a character to its child; the None key holds (length, target)
+# for a phrase ending at that node.
+phrase_trie = {}
+
 # Helper to load dictionary correctly
-def load_dict(filename, target_map):
+def load_dict(filename, target_map, verbose=True):
     path = os.path.join(DICTIONARY_DIR, filename)
-    if not os.path.exists(path):
-        print(f"Warning: {filename} not found at {path}.")
+    try:
+        # Read and decode the whole file at once, then split lines in C
+        with open(path, 'rb') as f:
+            data = f.read().decode('utf-8')
+    except FileNotFoundError:
+        if verbose:
+            print(f"Warning: {filename} not found at {path}.")
         return
     
     count = 0
-    with open(path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line: continue
-            
-            parts = line.split('\t') # Assume tab-separated
-            parts = [p for p in parts if p] # Filter out empty strings from split
-            
-            if len(parts) >= 2:
-                source = parts[0]
-                # Take only the first Traditional Chinese option, if there are multiple separated by space
-                target = parts[1].split(' ')[0]
-                target_map[source] = target
-                count += 1
-    print(f"Loaded {count} entries from {filename}")
-
-print("Loading dictionaries...")
-load_dict('STPhrases.txt', phrase_map)
-load_dict('STCharacters.txt', char_map)
-
-# Optimization: Max length of a phrase
-max_phrase_len = 0
-if phrase_map:
-    max_phrase_len = max(len(k) for k in phrase_map.keys())
+    for line in data.splitlines():
+        # Format: source<TAB>target [alternative targets...]
+        source, sep, rest = line.strip().partition('\t')
+        if not sep: continue
+        
+        # Take only the first Traditional Chinese option, if there are multiple separated by space
+        target = rest.partition(' ')[0].partition('\t')[0]
+        if source and target:
+            target_map[source] = target
+            count += 1
+    if verbose:
+        print(f"Loaded {count} entries from {filename}")
 
-print(f"Max phrase length: {max_phrase_len}")
+# Load the dictionaries and build the lookup structures.
+# main() calls this once; it is also the worker initializer, where it is silent.
+# Forked workers inherit the loaded tables and return immediately.
+def load_tables(verbose=False):
+    global char_table, convertible_chars
+    if phrase_map or char_map:
+        return
+    
+    if verbose:
+        print("Loading dictionaries...")
+    load_dict('STPhrases.txt', phrase_map, verbose)
+    load_dict('STCharacters.txt', char_map, verbose)
+    
+    # Only single-character keys can ever be hit by the per-character lookup
+    char_table = str.maketrans({k: v for k, v in char_map.items() if len(k) == 1})
+    convertible_chars = frozenset(k[0] for k in phrase_map) | frozenset(char_map)
+    
+    for source, target in phrase_map.items():
+        node = phrase_trie
+        for ch in source:
+            node = node.setdefault(ch, {})
+        node[None] = (len(source), target)
 
 # Function to check if a string contains any Chinese characters
+han_pattern = re.compile(r'[\u4e00-\u9fff]')
+
 def contains_chinese(text):
-    return bool(re.search(r'[\u4e00-\u9fff]', text))
+    return han_pattern.search(text) is not None
+
+han_search = han_pattern.search # Bound once for the per-cell loop
 
+# Game text repeats a lot (UI labels, names, common lines), so cache results per cell
+@lru_cache(maxsize=200_000)
 def convert_text(text):
-    if not text:
+    # isdisjoint() walks the string in C, so already-Traditional text exits early
+    if not text or convertible_chars.isdisjoint(text):
         return text
     
     result = []
     i = 0
     n = len(text)
+    run_start = 0 # Start of the current run of characters not covered by a phrase
     
     while i < n:
-        matched = False
-        limit = min(max_phrase_len, n - i)
-        for length in range(limit, 0, -1): # Iterate from longest possible match down to 1 character
-            sub = text[i : i + length]
-            if sub in phrase_map:
-                result.append(phrase_map[sub])
-                i += length
-                matched = True
+        # Walk the trie from position i, remembering the longest phrase seen
+        node = phrase_trie
+        match = None
+        j = i
+        while j < n:
+            node = node.get(text[j])
+            if node is None:
                 break
+            j += 1
+            match = node.get(None, match)
         
-        if not matched:
-            char = text[i]
-            if char in char_map:
-                result.append(char_map[char])
-            else:
-                result.append(char)
+        if match:
+            length, target = match
+            result.append(text[run_start:i].translate(char_table))
+            result.append(target)
+            i += length
+            run_start = i
+        else:
             i += 1
             
+    result.append(text[run_start:].translate(char_table))
     return "".join(result)
 
-# Process files
-# Ensure TARGET_DIR exists before globbing
-if not os.path.isdir(TARGET_DIR):
-    print(f"Error: Target directory '{TARGET_DIR}' not found. Please provide a valid directory.")
-    sys.exit(1)
+# Convert the Chinese cells of each row. csv.reader yields a fresh list per row,
+# so the row is updated in place rather than copied.
+def convert_rows(reader):
+    for row in reader:
+        for col_index, cell_value in enumerate(row):
+            # isascii() is a cheap flag check that rules out IDs, numbers and English text
+            if not cell_value.isascii() and han_search(cell_value):
+                row[col_index] = convert_text(cell_value)
+        yield row
 
-csv_files = glob.glob(os.path.join(TARGET_DIR, '*.csv'))
-print(f"Found {len(csv_files)} CSV files in {TARGET_DIR}.")
-
-for file_path in csv_files:
+# Convert one CSV file in place (via a temp file)
+def process_file(file_path):
     print(f"Processing {file_path}...")
     temp_file_path = file_path + '.tmp'
     
-    with open(file_path, 'r', encoding='utf-8', newline='') as infile, \
-         open(temp_file_path, 'w', encoding='utf-8', newline='') as outfile:
+    with open(file_path, 'r', encoding='utf-8', newline='', buffering=IO_BUFFER_SIZE) as infile, \
+         open(temp_file_path, 'w', encoding='utf-8', newline='', buffering=IO_BUFFER_SIZE) as outfile:
         
         reader = csv.reader(infile)
         writer = csv.writer(outfile)
@@ -116,17 +151,45 @@ for file_path in csv_files:
             headers = next(reader)
         except StopIteration:
             writer.writerow([])
-            continue
+            return
             
         writer.writerow(headers)
         
-        for row in reader:
-            new_row = list(row)
-            for col_index, cell_value in enumerate(row):
-                if contains_chinese(cell_value):
-                    new_row[col_index] = convert_text(cell_value)
-            writer.writerow(new_row)
+        writer.writerows(convert_rows(reader))
             
     os.replace(temp_file_path, file_path)
 
-print("Conversion complete.")
+def main():
+    load_tables(verbose=True)
+
+    target_dir = DEFAULT_TARGET_DIR
+
+    # Check for command-line arguments for target_dir
+    if len(sys.argv) > 1:
+        target_dir = sys.argv[1]
+        print(f"Using target directory from argument: {target_dir}")
+    else:
+        print(f"Using default target directory: {DEFAULT_TARGET_DIR}")
+
+    # Process files
+    # Ensure target_dir exists before listing it
+    if not os.path.isdir(target_dir):
+        print(f"Error: Target directory '{target_dir}' not found. Please provide a valid directory.")
+        sys.exit(1)
+
+    # Hidden files are skipped, as glob('*.csv') did
+    with os.scandir(target_dir) as entries:
+        csv_files = [
+            entry.path for entry in entries
+            if entry.name.endswith('.csv') and not entry.name.startswith('.') and entry.is_file()
+        ]
+    print(f"Found {len(csv_files)} CSV files in {target_dir}.")
+
+    # Files are independent, so convert them in parallel across processes
+    with ProcessPoolExecutor(initializer=load_tables) as executor:
+        list(executor.map(process_file, csv_files))
+
+    print("Conversion complete.")
+
+if __name__ == '__main__':
+    main()